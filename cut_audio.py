@@ -7,11 +7,25 @@ Cuts audio files into specified duration chunks.
 import argparse
 import os
 import sys
+import json
 import math
+import subprocess
 from pathlib import Path
-from pydub import AudioSegment
+import soundfile as sf
+from scipy.signal import resample_poly
+from vad import CHUNK_MANIFEST, SAMPLE_RATE, detect_speech, plan_chunks
+from video_to_audio import convert_to_memory
 
-def cut_audio_file(input_file, chunk_duration=10, output_dir=None, output_format="mp3"):
+# FFmpeg encoders used when the output format differs from the source
+AUDIO_CODECS = {
+    "mp3": "libmp3lame",
+    "wav": "pcm_s16le",
+    "aac": "aac",
+    "flac": "flac",
+}
+
+def cut_audio_file(input_file, chunk_duration=10, output_dir=None, output_format="mp3",
+                   start_chunk=None, end_chunk=None, vad=False, sample_rate=None):
     """
     Cut audio file into chunks of specified duration.
     
@@ -20,6 +34,10 @@ def cut_audio_file(input_file, chunk_duration=10, output_dir=None, output_format
         chunk_duration: Duration of each chunk in minutes (default: 10)
         output_dir: Output directory for chunks (default: input_file_chunks)
         output_format: Output format (mp3, wav, etc.)
+        start_chunk: First chunk to extract, 1-based (default: first)
+        end_chunk: Last chunk to extract, inclusive (default: last)
+        vad: Cut along detected speech and skip silence; chunks are at most chunk_duration long
+        sample_rate: Resample chunks to this rate, mono (e.g. 16000 for Whisper); default keeps the source
     """
     input_path = Path(input_file)
     
@@ -42,65 +60,357 @@ def cut_audio_file(input_file, chunk_duration=10, output_dir=None, output_format
         print(f"❌ Error creating output directory: {e}")
         return False
     
-    # Load audio file
-    print(f"🎵 Loading audio file: {input_file}")
+    # A manifest left over from an earlier VAD run would shift subtitle times
+    (output_path / CHUNK_MANIFEST).unlink(missing_ok=True)
+    
+    if vad:
+        print(f"🗣️  Detecting speech in '{input_file}' (chunks up to {chunk_duration} minutes)...")
+        return _cut_with_vad(input_path, chunk_duration, output_path, output_format, sample_rate)
+    
+    print(f"✂️  Splitting '{input_file}' into chunks of {chunk_duration} minutes each...")
+    
     try:
-        # Try to load based on file extension
-        file_ext = input_path.suffix.lower()
-        if file_ext == '.mp3':
-            audio = AudioSegment.from_mp3(input_file)
-        elif file_ext == '.wav':
-            audio = AudioSegment.from_wav(input_file)
-        elif file_ext == '.m4a':
-            audio = AudioSegment.from_file(input_file, format="m4a")
-        else:
-            # Try to auto-detect format
-            audio = AudioSegment.from_file(input_file)
-            
-    except Exception as e:
-        print(f"❌ Error loading audio file: {e}")
-        print("💡 Make sure you have the required audio libraries installed:")
-        print("   pip install pydub")
-        print("   For MP3 support: pip install pydub[mp3]")
+        if start_chunk is None and end_chunk is None:
+            return _cut_with_ffmpeg(input_path, chunk_duration, output_path, output_format, sample_rate)
+        return _cut_range_with_ffmpeg(input_path, chunk_duration, output_path, output_format,
+                                      start_chunk, end_chunk, sample_rate)
+    except FileNotFoundError:
+        print("⚠️  FFmpeg not found, falling back to soundfile (WAV/FLAC/OGG/MP3 input only).")
+        print("   macOS: brew install ffmpeg")
+        print("   Linux: sudo apt-get install ffmpeg")
+        return _cut_with_soundfile(input_path, chunk_duration, output_path, output_format,
+                                   start_chunk, end_chunk, sample_rate)
+
+def _codec_args(input_path, output_format, allow_copy=True, sample_rate=None):
+    """FFmpeg codec arguments: stream copy if the format is unchanged, otherwise encode."""
+    # Re-encode only when the requested format differs from the source or resampling is needed
+    source_format = input_path.suffix.lower().lstrip('.')
+    if allow_copy and sample_rate is None and source_format == output_format:
+        return ["-c", "copy"]
+    
+    codec_args = ["-c:a", AUDIO_CODECS.get(output_format, "libmp3lame")]
+    if sample_rate is not None:
+        codec_args += ["-ar", str(sample_rate), "-ac", "1"]
+    if output_format in ("mp3", "aac"):
+        # Mono speech at 16 kHz needs far less than 192k (and MPEG-2 layer III tops out at 160k)
+        codec_args += ["-b:a", "192k" if sample_rate is None else "64k"]
+    return codec_args
+
+def _probe_duration(input_path):
+    """Return media duration in seconds using ffprobe. Raises FileNotFoundError if ffprobe is missing."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "csv=p=0",
+        str(input_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+def build_segment_command(input_path, chunk_duration, output_path, output_format,
+                          sample_rate=None, segment_list=None):
+    """
+    Build the FFmpeg segment muxer command that writes part_NNN chunks.
+    
+    Args:
+        input_path: Path to input audio file
+        chunk_duration: Duration of each chunk in minutes
+        output_path: Output directory for chunks
+        output_format: Output format (mp3, wav, etc.)
+        sample_rate: Resample chunks to this rate, mono (default: keep source)
+        segment_list: File FFmpeg appends each chunk name to once that chunk is complete
+    """
+    input_path = Path(input_path)
+    codec_args = _codec_args(input_path, output_format, sample_rate=sample_rate)
+    chunk_pattern = Path(output_path) / f"part_%03d.{output_format}"
+    
+    list_args = []
+    if segment_list is not None:
+        list_args = ["-segment_list", str(segment_list), "-segment_list_type", "flat"]
+    
+    # FFmpeg segment muxer: slices at packet boundaries without decoding to PCM
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-y",
+        "-i", str(input_path),
+        "-vn",  # No video
+        "-map", "0:a",
+        *codec_args,
+        "-f", "segment",
+        "-segment_time", str(chunk_duration * 60),
+        "-segment_start_number", "1",  # part_001 first, as in every other cutting path
+        "-reset_timestamps", "1",
+        *list_args,
+        str(chunk_pattern)
+    ]
+
+def _cut_with_ffmpeg(input_path, chunk_duration, output_path, output_format, sample_rate=None):
+    """Cut chunks with FFmpeg's segment muxer. Raises FileNotFoundError if FFmpeg is missing."""
+    chunk_duration_sec = chunk_duration * 60
+    cmd = build_segment_command(input_path, chunk_duration, output_path, output_format, sample_rate)
+    # Progress key=value lines on stdout, inserted before the output pattern
+    cmd[-1:-1] = ["-progress", "pipe:1"]
+    
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    
+    # Report each chunk as soon as FFmpeg's progress moves past its end
+    chunk_template = f"part_{{:03d}}.{output_format}"
+    saved_chunks = 0
+    elapsed_sec = 0.0
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if key == "out_time_us" and value.isdigit():
+            elapsed_sec = int(value) / 1_000_000
+            while elapsed_sec >= (saved_chunks + 1) * chunk_duration_sec:
+                saved_chunks += 1
+                print(f"✅ Saved: {chunk_template.format(saved_chunks)} ({chunk_duration:.2f} min)")
+    
+    stderr = process.stderr.read()
+    process.wait()
+    
+    if process.returncode != 0:
+        print(f"❌ FFmpeg error: {stderr}")
+        return False
+    
+    # Last (possibly partial) chunk
+    remainder_sec = elapsed_sec - saved_chunks * chunk_duration_sec
+    if remainder_sec > 0:
+        saved_chunks += 1
+        print(f"✅ Saved: {chunk_template.format(saved_chunks)} ({remainder_sec / 60:.2f} min)")
+    
+    print(f"⏱️  Total duration: {elapsed_sec / 60:.2f} minutes")
+    print(f"🎉 Successfully created {saved_chunks} audio chunks in '{output_path}'")
+    return True
+
+def _cut_range_with_ffmpeg(input_path, chunk_duration, output_path, output_format,
+                          start_chunk=None, end_chunk=None, sample_rate=None):
+    """Extract selected chunks with input seeking, so only the requested range is read."""
+    try:
+        total_duration_sec = _probe_duration(input_path)
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"❌ Error reading duration of '{input_path}': {e}")
+        return False
+    
+    chunk_duration_sec = chunk_duration * 60
+    num_chunks = math.ceil(total_duration_sec / chunk_duration_sec)
+    first, last = _clamp_chunk_range(start_chunk, end_chunk, num_chunks)
+    if first > last:
+        print(f"❌ Chunk range is empty: the file has {num_chunks} chunks")
         return False
     
-    # Calculate chunk parameters
-    chunk_duration_ms = chunk_duration * 60 * 1000  # Convert to milliseconds
-    total_duration_ms = len(audio)
-    total_duration_min = total_duration_ms / 60000
-    num_chunks = math.ceil(total_duration_ms / chunk_duration_ms)
+    # Copied AAC packets don't split cleanly on arbitrary timestamps, so always re-encode it
+    codec_args = _codec_args(input_path, output_format, allow_copy=output_format != "aac",
+                             sample_rate=sample_rate)
     
-    print(f"⏱️  Total duration: {total_duration_min:.2f} minutes")
-    print(f"✂️  Splitting into {num_chunks} chunks of {chunk_duration} minutes each...")
+    print(f"⏱️  Total duration: {total_duration_sec / 60:.2f} minutes")
+    print(f"🎯 Extracting chunks {first}-{last} of {num_chunks}")
+    
+    # Path strings and the filename template are built once, not per chunk
+    input_file = str(input_path)
+    output_dir = str(output_path)
+    chunk_template = f"part_{{:03d}}.{output_format}"
     
-    # Cut and save chunks
     successful_chunks = 0
-    for i in range(num_chunks):
-        start = i * chunk_duration_ms
-        end = min((i + 1) * chunk_duration_ms, total_duration_ms)
-        chunk = audio[start:end]
+    for i in range(first - 1, last):
+        start_sec = i * chunk_duration_sec
+        end_sec = min((i + 1) * chunk_duration_sec, total_duration_sec)
+        
+        # Generate output filename
+        chunk_path = os.path.join(output_dir, chunk_template.format(i + 1))
         
+        if _extract_chunk(input_file, start_sec, end_sec, chunk_path, codec_args):
+            successful_chunks += 1
+    
+    expected_chunks = last - first + 1
+    if successful_chunks == expected_chunks:
+        print(f"🎉 Successfully created {successful_chunks} audio chunks in '{output_path}'")
+        return True
+    else:
+        print(f"⚠️  Created {successful_chunks} out of {expected_chunks} chunks")
+        return False
+
+def _cut_with_vad(input_path, chunk_duration, output_path, output_format, sample_rate=None):
+    """Cut chunks along detected speech, skipping silence, and record their source offsets."""
+    audio = convert_to_memory(input_path, SAMPLE_RATE)
+    if audio is None:
+        return False
+    
+    total_duration_sec = len(audio) / SAMPLE_RATE
+    chunks = plan_chunks(detect_speech(audio, SAMPLE_RATE), chunk_duration * 60, total_duration_sec)
+    del audio
+    
+    kept_sec = sum(end - start for start, end in chunks)
+    print(f"⏱️  Total duration: {total_duration_sec / 60:.2f} minutes")
+    print(f"🗣️  Speech regions: {kept_sec / 60:.2f} minutes in {len(chunks)} chunks "
+          f"({total_duration_sec - kept_sec:.0f}s of silence skipped)")
+    
+    if not chunks:
+        print(f"❌ No speech detected in '{input_path}' (try without --vad)")
+        return False
+    
+    # Chunks start at arbitrary timestamps, so AAC is re-encoded as for ranges
+    codec_args = _codec_args(input_path, output_format, allow_copy=output_format != "aac",
+                             sample_rate=sample_rate)
+    
+    # Offsets let the transcriber keep subtitle times relative to the source file
+    manifest = {}
+    input_file = str(input_path)
+    output_dir = str(output_path)
+    chunk_template = f"part_{{:03d}}.{output_format}"
+    
+    successful_chunks = 0
+    for i, (start_sec, end_sec) in enumerate(chunks):
         # Generate output filename
-        chunk_filename = f"part_{i+1:03d}.{output_format}"
-        chunk_path = output_path / chunk_filename
+        chunk_filename = chunk_template.format(i + 1)
+        chunk_path = os.path.join(output_dir, chunk_filename)
         
-        try:
-            # Export chunk
-            chunk.export(str(chunk_path), format=output_format)
-            chunk_duration_actual = (end - start) / 60000
-            print(f"✅ Saved: {chunk_filename} ({chunk_duration_actual:.2f} min)")
+        if _extract_chunk(input_file, start_sec, end_sec, chunk_path, codec_args):
+            manifest[chunk_filename] = {"start": start_sec, "end": end_sec}
             successful_chunks += 1
+    
+    with open(output_path / CHUNK_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    
+    if successful_chunks == len(chunks):
+        print(f"🎉 Successfully created {successful_chunks} audio chunks in '{output_path}'")
+        return True
+    else:
+        print(f"⚠️  Created {successful_chunks} out of {len(chunks)} chunks")
+        return False
+
+def _extract_chunk(input_file, start_sec, end_sec, chunk_path, codec_args):
+    """Extract [start_sec, end_sec) into chunk_path (both str) using input seeking. Returns True on success."""
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-y",
+        "-ss", str(start_sec),
+        "-to", str(end_sec),
+        "-i", input_file,
+        "-vn",  # No video
+        "-map", "0:a",
+        *codec_args,
+        "-avoid_negative_ts", "make_zero",
+        chunk_path
+    ]
+    
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ Error saving chunk {os.path.basename(chunk_path)}: {result.stderr}")
+        return False
+    
+    print(f"✅ Saved: {os.path.basename(chunk_path)} ({(end_sec - start_sec) / 60:.2f} min)")
+    return True
+
+def _clamp_chunk_range(start_chunk, end_chunk, num_chunks):
+    """Resolve an optional 1-based inclusive chunk range against the actual chunk count."""
+    first = max(1, start_chunk or 1)
+    last = min(num_chunks, end_chunk or num_chunks)
+    return first, last
+
+def _cut_with_soundfile(input_path, chunk_duration, output_path, output_format,
+                        start_chunk=None, end_chunk=None, sample_rate=None):
+    """Cut chunks by seeking and block-reading PCM with soundfile, one chunk in memory at a time."""
+    # libsndfile cannot write every format (e.g. AAC)
+    if output_format.upper() not in sf.available_formats():
+        print(f"⚠️  soundfile cannot write {output_format}, saving chunks as wav")
+        output_format = "wav"
+    
+    try:
+        src = sf.SoundFile(str(input_path))
+    except Exception as e:
+        print(f"❌ Error loading audio file: {e}")
+        return False
+    
+    with src:
+        source_rate = src.samplerate
+        output_rate = sample_rate or source_rate
+        frames_per_chunk = int(chunk_duration * 60 * source_rate)
+        num_chunks = math.ceil(src.frames / frames_per_chunk)
+        first, last = _clamp_chunk_range(start_chunk, end_chunk, num_chunks)
+        if first > last:
+            print(f"❌ Chunk range is empty: the file has {num_chunks} chunks")
+            return False
+        subtype = "PCM_16" if output_format in ("wav", "flac") else None
+        
+        # Polyphase resampling factors, reduced so the filter stays short
+        factor = math.gcd(output_rate, source_rate)
+        up, down = output_rate // factor, source_rate // factor
+        
+        print(f"⏱️  Total duration: {src.frames / source_rate / 60:.2f} minutes")
+        
+        output_dir = str(output_path)
+        chunk_template = f"part_{{:03d}}.{output_format}"
+        
+        successful_chunks = 0
+        for i in range(first - 1, last):
+            src.seek(i * frames_per_chunk)
+            data = src.read(frames_per_chunk, dtype='float32')
+            if sample_rate is not None:
+                if data.ndim > 1:
+                    data = data.mean(axis=1)
+                if up != down:
+                    data = resample_poly(data, up, down).astype('float32')
+            
+            # Generate output filename
+            chunk_filename = chunk_template.format(i + 1)
+            chunk_path = os.path.join(output_dir, chunk_filename)
             
-        except Exception as e:
-            print(f"❌ Error saving chunk {i+1}: {e}")
+            try:
+                sf.write(chunk_path, data, output_rate, subtype=subtype)
+                print(f"✅ Saved: {chunk_filename} ({len(data) / output_rate / 60:.2f} min)")
+                successful_chunks += 1
+            except Exception as e:
+                print(f"❌ Error saving chunk {i+1}: {e}")
     
-    if successful_chunks == num_chunks:
-        print(f"🎉 Successfully created {successful_chunks} audio chunks in '{output_dir}'")
+    expected_chunks = last - first + 1
+    if successful_chunks == expected_chunks:
+        print(f"🎉 Successfully created {successful_chunks} audio chunks in '{output_path}'")
         return True
     else:
-        print(f"⚠️  Created {successful_chunks} out of {num_chunks} chunks")
+        print(f"⚠️  Created {successful_chunks} out of {expected_chunks} chunks")
         return False
 
+def split_audio_in_memory(input_file, sample_rate, chunk_duration=10):
+    """
+    Decode audio once and split it into in-memory chunks.
+    
+    Args:
+        input_file: Path to input video or audio file
+        sample_rate: Sample rate to decode at
+        chunk_duration: Duration of each chunk in minutes, or None for a single chunk
+    
+    Returns:
+        List of mono float32 arrays, each a view into the decoded audio,
+        or None if decoding failed
+    """
+    audio = convert_to_memory(input_file, sample_rate)
+    if audio is None:
+        return None
+    
+    if chunk_duration is None:
+        return [audio]
+    
+    chunk_size = chunk_duration * 60 * sample_rate
+    return [audio[start:start + chunk_size] for start in range(0, max(1, len(audio)), chunk_size)]
+
+def parse_chunk_range(value):
+    """Parse a '3-7' or '5' chunk range into a (start, end) tuple of 1-based chunk numbers."""
+    start, sep, end = value.partition('-')
+    try:
+        start_chunk = int(start)
+        end_chunk = int(end) if sep else start_chunk
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid chunk range '{value}' (expected e.g. 3-7)")
+    if start_chunk < 1 or end_chunk < start_chunk:
+        raise argparse.ArgumentTypeError(f"invalid chunk range '{value}' (expected e.g. 3-7)")
+    return start_chunk, end_chunk
+
 def main():
     parser = argparse.ArgumentParser(description="Cut audio files into chunks")
     parser.add_argument("input_file", help="Input audio file path")
@@ -109,14 +419,27 @@ def main():
     parser.add_argument("-o", "--output-dir", help="Output directory for chunks")
     parser.add_argument("-f", "--format", default="mp3", choices=["mp3", "wav", "aac", "flac"], 
                        help="Output format (default: mp3)")
+    parser.add_argument("--chunks", type=parse_chunk_range, metavar="START-END",
+                       help="Only extract this range of chunks, e.g. 3-7 or 5 (default: all)")
+    parser.add_argument("--vad", action="store_true",
+                       help="Cut along detected speech and skip silent parts")
+    parser.add_argument("-r", "--sample-rate", type=int,
+                       help="Resample chunks to this rate in mono, e.g. 16000 for Whisper (default: keep source)")
     
     args = parser.parse_args()
+    if args.vad and args.chunks:
+        parser.error("--vad cannot be combined with --chunks")
+    start_chunk, end_chunk = args.chunks or (None, None)
     
     success = cut_audio_file(
         args.input_file, 
         args.duration, 
         args.output_dir, 
-        args.format
+        args.format,
+        start_chunk,
+        end_chunk,
+        args.vad,
+        args.sample_rate
     )
     
     sys.exit(0 if success else 1)
@@ -5,25 +5,157 @@ Orchestrates video-to-audio conversion, audio cutting, and transcription.
 """
 
 import argparse
+import asyncio
 import sys
-import subprocess
 from pathlib import Path
+from cut_audio import build_segment_command, cut_audio_file, split_audio_in_memory
+from vad import CHUNK_MANIFEST, SAMPLE_RATE
+from video_to_audio import convert_video_to_audio
 
-def run_script(script_name, args):
-    """Run a script with given arguments."""
-    cmd = [sys.executable, script_name] + args
-    print(f"🔧 Running: {' '.join(cmd)}")
+# Chunks cut for transcription: 16 kHz mono PCM, read by Whisper without decoding
+TRANSCRIPTION_CHUNK_FORMAT = "wav"
+
+# FFmpeg appends each finished chunk's name here while cutting
+SEGMENT_LIST = "segments.txt"
+
+# How often to check for newly finished chunks, in seconds
+POLL_INTERVAL = 0.5
+
+def prewarm_model(model, adaptive=False):
+    """Download the Whisper model(s) if needed, without loading them into this process."""
+    # Imported here so converting and cutting work without faster-whisper installed
+    from faster_whisper import download_model
+    from transcribe_audio import PROBE_MODEL
     
+    # Loading here would keep an extra copy in memory next to the workers' own
+    print(f"🤖 Fetching Whisper model '{model}'...")
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(result.stdout)
+        download_model(model)
+        if adaptive:
+            download_model(PROBE_MODEL)
+    except Exception as e:
+        print(f"❌ Error downloading Whisper model: {e}")
+        return False
+    return True
+
+def transcribe_in_memory(input_file, language, model, chunk_duration, output_dir, output_format, workers=None,
+                         adaptive=False):
+    """
+    Decode once into memory, slice into chunks and transcribe them without touching disk.
+    
+    Args:
+        input_file: Path to input video or audio file
+        language: Language code or 'auto' for auto-detection
+        model: Whisper model size
+        chunk_duration: Duration of each chunk in minutes, or None for the whole file
+        output_dir: Output directory for transcripts
+        output_format: Output format (txt, json, srt, vtt)
+        workers: Number of parallel transcription processes (default: auto)
+        adaptive: Use the tiny model for chunks where its probe transcription is confident
+    """
+    from transcribe_audio import transcribe_audio_arrays
+    
+    chunks = split_audio_in_memory(input_file, SAMPLE_RATE, chunk_duration)
+    if chunks is None:
+        return False
+    
+    if chunk_duration is None:
+        named_chunks = [(Path(input_file).stem, chunks[0])]
+    else:
+        named_chunks = [(f"part_{i+1:03d}", audio) for i, audio in enumerate(chunks)]
+    
+    return transcribe_audio_arrays(named_chunks, language, model, output_dir, output_format, workers, adaptive)
+
+async def cut_and_transcribe(audio_file, chunks_dir, transcripts_dir, args):
+    """
+    Cut audio with FFmpeg's segmenter and transcribe each chunk as soon as it is finished,
+    so transcription overlaps with cutting instead of waiting for it.
+    
+    Returns:
+        True/False for success, or None if FFmpeg is not installed
+    """
+    chunks_dir.mkdir(parents=True, exist_ok=True)
+    transcripts_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Stale files from an earlier run would be mistaken for fresh chunks / offsets
+    segment_list = chunks_dir / SEGMENT_LIST
+    segment_list.unlink(missing_ok=True)
+    (chunks_dir / CHUNK_MANIFEST).unlink(missing_ok=True)
+    
+    cmd = build_segment_command(audio_file, args.duration, chunks_dir, TRANSCRIPTION_CHUNK_FORMAT,
+                                SAMPLE_RATE, segment_list)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        return None
+    
+    queue = asyncio.Queue()
+    consumer = asyncio.create_task(transcribe_from_queue(queue, transcripts_dir, args))
+    stderr_reader = asyncio.create_task(process.stderr.read())
+    
+    # Poll the segment list: a name only appears there once FFmpeg has closed that chunk
+    queued = 0
+    while True:
+        finished = process.returncode is not None
+        names = _read_segment_list(segment_list)
+        for name in names[queued:]:
+            print(f"✅ Chunk ready: {name}")
+            await queue.put(chunks_dir / name)
+        queued = len(names)
+        
+        if finished:
+            break
+        try:
+            await asyncio.wait_for(process.wait(), timeout=POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+    
+    await queue.put(None)
+    stderr = await stderr_reader
+    successful_transcriptions = await consumer
+    segment_list.unlink(missing_ok=True)
+    
+    if process.returncode != 0:
+        print(f"❌ FFmpeg error: {stderr.decode(errors='replace')}")
+        return False
+    
+    if successful_transcriptions == queued:
+        print(f"\n🎉 Successfully transcribed all {successful_transcriptions} chunks!")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error running {script_name}:")
-        print(e.stderr)
+    else:
+        print(f"\n⚠️  Transcribed {successful_transcriptions} out of {queued} chunks")
         return False
 
-def main():
+async def transcribe_from_queue(queue, transcripts_dir, args):
+    """Transcribe chunk paths from the queue until None arrives. Returns the number of successes."""
+    from transcribe_audio import transcribe_file
+    
+    loop = asyncio.get_running_loop()
+    successful_transcriptions = 0
+    while True:
+        chunk_path = await queue.get()
+        if chunk_path is None:
+            return successful_transcriptions
+        
+        # Whisper is blocking; run it in a thread so the event loop keeps polling FFmpeg
+        if await loop.run_in_executor(None, transcribe_file, chunk_path, args.language,
+                                      args.model, transcripts_dir, args.format, args.adaptive_model):
+            successful_transcriptions += 1
+
+def _read_segment_list(segment_list):
+    """Return the chunk names FFmpeg has completed so far (ignores a partially written line)."""
+    try:
+        content = segment_list.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return []
+    return [line.strip() for line in content.splitlines(keepends=True) if line.endswith("\n")]
+
+async def main():
     parser = argparse.ArgumentParser(description="Process media files: video → audio → chunks → transcription")
     
     # Input options
@@ -38,10 +170,14 @@ def main():
                        help="Skip audio cutting (transcribe whole file)")
     parser.add_argument("--skip-transcription", action="store_true",
                        help="Skip transcription (only process audio)")
+    parser.add_argument("--in-memory", action="store_true",
+                       help="Decode audio once into memory and transcribe chunks without intermediate files")
     
     # Audio cutting options
     parser.add_argument("-d", "--duration", type=int, default=10,
                        help="Duration of audio chunks in minutes (default: 10)")
+    parser.add_argument("--vad", action="store_true",
+                       help="Cut along detected speech and skip silence (chunks up to --duration minutes)")
     
     # Transcription options
     parser.add_argument("-m", "--model", default="base",
@@ -50,6 +186,12 @@ def main():
     parser.add_argument("-f", "--format", default="txt",
                        choices=["txt", "json", "srt", "vtt"],
                        help="Transcription output format (default: txt)")
+    parser.add_argument("-j", "--workers", type=int,
+                       help="Number of parallel transcription processes (default: auto)")
+    parser.add_argument("--adaptive-model", action="store_true",
+                       help="Probe each chunk with the tiny model and keep its output when it is confident")
+    parser.add_argument("--overlap", action="store_true",
+                       help="Transcribe each chunk as soon as FFmpeg finishes cutting it (single process)")
     
     # Output options
     parser.add_argument("-o", "--output-dir", help="Output directory for final results")
@@ -66,6 +208,10 @@ def main():
         print(f"❌ Error: Input file '{args.input_file}' not found.")
         sys.exit(1)
     
+    if args.overlap and (args.vad or (args.workers or 1) > 1):
+        print("❌ --overlap cannot be combined with --vad or -j greater than 1")
+        sys.exit(1)
+    
     # Set up paths
     base_name = input_path.stem
     working_dir = input_path.parent
@@ -78,24 +224,54 @@ def main():
     
     current_audio_file = None
     
+    # Fetch the model up front, so a cold download doesn't stall the pipeline midway
+    if not args.skip_transcription and not prewarm_model(args.model, args.adaptive_model):
+        sys.exit(1)
+    
     print(f"🎬 Starting media processing pipeline for: {input_path.name}")
     print(f"📁 Working directory: {working_dir}")
     print(f"📁 Output directory: {output_dir}")
     
+    # In-memory mode: one decode, NumPy slicing, direct transcription
+    if args.in_memory:
+        if args.skip_transcription:
+            print("❌ --in-memory cannot be combined with --skip-transcription")
+            sys.exit(1)
+        if args.vad or args.overlap:
+            print("❌ --in-memory cannot be combined with --vad or --overlap")
+            sys.exit(1)
+        
+        print(f"\n=== Transcribing Audio In Memory ===")
+        transcripts_dir = output_dir / f"{base_name}_transcripts"
+        
+        if not transcribe_in_memory(
+            input_path,
+            args.language,
+            args.model,
+            None if args.skip_cutting else args.duration,
+            transcripts_dir,
+            args.format,
+            args.workers,
+            args.adaptive_model
+        ):
+            print("❌ Transcription failed!")
+            sys.exit(1)
+        
+        print(f"\n🎉 Pipeline completed successfully!")
+        print(f"📁 Results saved in: {output_dir}")
+        return
+    
     # Step 1: Video to Audio conversion
     if not args.skip_video_conversion:
         print(f"\n=== Step 1: Converting Video to Audio ===")
         audio_file = output_dir / f"{base_name}.{args.audio_format}"
         
-        video_args = [
-            str(input_path),
-            "-o", str(audio_file),
-            "-f", args.audio_format,
-            "-q", args.audio_quality,
-            "--force"  # Automatically overwrite existing files
-        ]
-        
-        if not run_script("video_to_audio.py", video_args):
+        if not convert_video_to_audio(
+            input_path,
+            audio_file,
+            args.audio_format,
+            args.audio_quality
+        ):
             print("❌ Video conversion failed!")
             sys.exit(1)
         
@@ -104,45 +280,67 @@ def main():
         print(f"\n=== Step 1: Skipping Video Conversion ===")
         current_audio_file = input_path
     
-    # Step 2: Audio cutting
-    if not args.skip_cutting:
-        print(f"\n=== Step 2: Cutting Audio into Chunks ===")
+    # Steps 2 + 3 overlapped (--overlap): transcribe each chunk while FFmpeg is still cutting the rest
+    overlapped = False
+    if args.overlap and not args.skip_cutting and not args.skip_transcription:
+        print(f"\n=== Steps 2-3: Cutting and Transcribing Audio ===")
         chunks_dir = output_dir / f"{base_name}_chunks"
+        transcripts_dir = output_dir / f"{base_name}_transcripts"
         
-        cutting_args = [
-            str(current_audio_file),
-            "-d", str(args.duration),
-            "-o", str(chunks_dir),
-            "-f", args.audio_format
-        ]
-        
-        if not run_script("cut_audio.py", cutting_args):
-            print("❌ Audio cutting failed!")
+        result = await cut_and_transcribe(current_audio_file, chunks_dir, transcripts_dir, args)
+        if result is None:
+            print("⚠️  FFmpeg not found, cutting and transcribing one after the other instead")
+        elif not result:
+            print("❌ Cutting/transcription failed!")
             sys.exit(1)
-        
-        transcription_input = chunks_dir
-    else:
-        print(f"\n=== Step 2: Skipping Audio Cutting ===")
-        transcription_input = current_audio_file
+        else:
+            overlapped = True
     
-    # Step 3: Transcription
-    if not args.skip_transcription:
-        print(f"\n=== Step 3: Transcribing Audio ===")
-        transcripts_dir = output_dir / f"{base_name}_transcripts"
-        
-        transcription_args = [
-            str(transcription_input),
-            "-l", args.language,
-            "-m", args.model,
-            "-o", str(transcripts_dir),
-            "-f", args.format
-        ]
+    if not overlapped:
+        # Step 2: Audio cutting
+        if not args.skip_cutting:
+            print(f"\n=== Step 2: Cutting Audio into Chunks ===")
+            chunks_dir = output_dir / f"{base_name}_chunks"
+            
+            # Whisper runs on 16 kHz mono, so resample once here instead of on every chunk;
+            # --audio-format only decides the chunk format when nothing is transcribed
+            if not cut_audio_file(
+                current_audio_file,
+                args.duration,
+                chunks_dir,
+                args.audio_format if args.skip_transcription else TRANSCRIPTION_CHUNK_FORMAT,
+                vad=args.vad,
+                sample_rate=None if args.skip_transcription else SAMPLE_RATE
+            ):
+                print("❌ Audio cutting failed!")
+                sys.exit(1)
+            
+            transcription_input = chunks_dir
+        else:
+            print(f"\n=== Step 2: Skipping Audio Cutting ===")
+            transcription_input = current_audio_file
         
-        if not run_script("transcribe_audio.py", transcription_args):
-            print("❌ Transcription failed!")
-            sys.exit(1)
-    else:
-        print(f"\n=== Step 3: Skipping Transcription ===")
+        # Step 3: Transcription
+        if not args.skip_transcription:
+            print(f"\n=== Step 3: Transcribing Audio ===")
+            transcripts_dir = output_dir / f"{base_name}_transcripts"
+            
+            from transcribe_audio import transcribe_audio_files
+            
+            # Run in-process so the loaded model stays warm for the whole pipeline
+            if not transcribe_audio_files(
+                transcription_input,
+                args.language,
+                args.model,
+                transcripts_dir,
+                args.format,
+                args.workers,
+                args.adaptive_model
+            ):
+                print("❌ Transcription failed!")
+                sys.exit(1)
+        else:
+            print(f"\n=== Step 3: Skipping Transcription ===")
     
     print(f"\n🎉 Pipeline completed successfully!")
     print(f"📁 Results saved in: {output_dir}")
@@ -158,4 +356,4 @@ def main():
     print(f"   Output directory: {output_dir}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -1,17 +1,39 @@
 #!/usr/bin/env python3
 """
 Audio Transcriber
-Transcribes audio files using OpenAI Whisper.
+Transcribes audio files using Whisper (faster-whisper / CTranslate2 backend).
 """
 
 import argparse
 import os
 import sys
 import glob
+import json
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from functools import lru_cache
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-import whisper
+import numpy as np
+import soundfile as sf
+import ctranslate2
+from faster_whisper import WhisperModel, decode_audio
+from vad import CHUNK_MANIFEST, SAMPLE_RATE
 
-def transcribe_audio_files(input_path, language="auto", model="base", output_dir=None, output_format="txt"):
+# Audio file extensions picked up when transcribing a directory
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac', '.aac'}
+
+# Buffer size for transcript files
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Adaptive mode: a cheap model transcribes a short probe; its output is kept when it is confident
+PROBE_MODEL = "tiny"
+PROBE_SECONDS = 30
+MIN_AVG_LOGPROB = -0.5
+MAX_NO_SPEECH_PROB = 0.3
+
+def transcribe_audio_files(input_path, language="auto", model="base", output_dir=None, output_format="txt",
+                           workers=None, adaptive=False):
     """
     Transcribe audio files using Whisper.
     
@@ -21,6 +43,8 @@ def transcribe_audio_files(input_path, language="auto", model="base", output_dir
         model: Whisper model size (tiny, base, small, medium, large)
         output_dir: Output directory for transcripts
         output_format: Output format (txt, json, srt, vtt)
+        workers: Number of parallel worker processes (default: based on CPU count and model)
+        adaptive: Use the tiny model for chunks where its probe transcription is confident
     """
     input_path = Path(input_path)
     
@@ -32,10 +56,10 @@ def transcribe_audio_files(input_path, language="auto", model="base", output_dir
             output_dir = input_path.parent / "transcripts"
     elif input_path.is_dir():
         # Directory - find all audio files
-        audio_extensions = ['*.mp3', '*.wav', '*.m4a', '*.flac', '*.aac']
-        audio_files = []
-        for ext in audio_extensions:
-            audio_files.extend(input_path.glob(ext))
+        audio_files = [
+            Path(entry.path) for entry in os.scandir(input_path)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS
+        ]
         
         if output_dir is None:
             output_dir = input_path / "transcripts"
@@ -47,6 +71,9 @@ def transcribe_audio_files(input_path, language="auto", model="base", output_dir
         print(f"❌ No audio files found in '{input_path}'")
         return False
     
+    # Source offsets of VAD chunks, so subtitle times match the original file
+    offsets = _load_chunk_offsets(audio_files[0].parent)
+    
     # Sort files for consistent processing order
     audio_files.sort()
     
@@ -59,67 +86,60 @@ def transcribe_audio_files(input_path, language="auto", model="base", output_dir
         print(f"❌ Error creating output directory: {e}")
         return False
     
-    # Load Whisper model
-    print(f"🤖 Loading Whisper model '{model}'...")
-    try:
-        whisper_model = whisper.load_model(model)
-    except Exception as e:
-        print(f"❌ Error loading Whisper model: {e}")
-        print("💡 Make sure you have whisper installed: pip install openai-whisper")
-        return False
+    if workers is None:
+        workers = default_workers(model)
+    workers = max(1, min(workers, len(audio_files)))
     
     print(f"🎵 Found {len(audio_files)} audio files to transcribe:")
     for file in audio_files:
         print(f"  - {file.name}")
     
-    # Transcribe each file
     successful_transcriptions = 0
-    for audio_file in audio_files:
-        print(f"\n📝 Transcribing: {audio_file.name}")
-        
+    if workers == 1:
+        # Load Whisper model in this process
+        print(f"\n🤖 Loading Whisper model '{model}'...")
         try:
-            # Transcribe with specified or auto-detected language
-            transcribe_options = {}
-            if language != "auto":
-                transcribe_options['language'] = language
-            
-            result = whisper_model.transcribe(str(audio_file), **transcribe_options)
-            
-            # Generate output filename
-            base_name = audio_file.stem
-            if output_format == "txt":
-                output_file = output_path / f"{base_name}.txt"
-                content = result["text"]
-            elif output_format == "json":
-                import json
-                output_file = output_path / f"{base_name}.json"
-                content = json.dumps(result, indent=2, ensure_ascii=False)
-            elif output_format == "srt":
-                output_file = output_path / f"{base_name}.srt"
-                content = generate_srt(result["segments"])
-            elif output_format == "vtt":
-                output_file = output_path / f"{base_name}.vtt"
-                content = generate_vtt(result["segments"])
-            else:
-                print(f"❌ Unsupported output format: {output_format}")
+            _init_worker(model, adaptive=adaptive)
+        except Exception as e:
+            print(f"❌ Error loading Whisper model: {e}")
+            print("💡 Make sure you have faster-whisper installed: pip install faster-whisper")
+            return False
+        
+        # Transcribe each file
+        for audio_file in audio_files:
+            print(f"\n📝 Transcribing: {audio_file.name}")
+            try:
+                output_file, result = _transcribe_one(audio_file, language, output_path, output_format,
+                                                      offsets.get(audio_file.name, 0.0))
+            except Exception as e:
+                print(f"❌ Error transcribing {audio_file.name}: {e}")
                 continue
             
-            # Save transcription
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            # Show preview and detected language
-            detected_language = result.get("language", "unknown")
-            preview = result["text"][:100] + "..." if len(result["text"]) > 100 else result["text"]
-            
-            print(f"✅ Saved: {output_file.name}")
-            print(f"🌐 Detected language: {detected_language}")
-            print(f"📄 Preview: {preview}")
-            
-            successful_transcriptions += 1
-            
-        except Exception as e:
-            print(f"❌ Error transcribing {audio_file.name}: {e}")
+            if _report_transcription(output_file, result):
+                successful_transcriptions += 1
+    else:
+        # Each worker loads its own copy of the model; split CPU threads between them.
+        # Workers are spawned, not forked, so they never inherit this process's CUDA state
+        print(f"\n🤖 Loading Whisper model '{model}' in {workers} worker processes...")
+        num_threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(model, num_threads, adaptive)) as executor:
+            futures = {
+                executor.submit(_transcribe_one, audio_file, language, output_path, output_format,
+                                offsets.get(audio_file.name, 0.0)): audio_file
+                for audio_file in audio_files
+            }
+            for future in as_completed(futures):
+                audio_file = futures[future]
+                print(f"\n📝 Transcribed: {audio_file.name}")
+                try:
+                    output_file, result = future.result()
+                except Exception as e:
+                    print(f"❌ Error transcribing {audio_file.name}: {e}")
+                    continue
+                
+                if _report_transcription(output_file, result):
+                    successful_transcriptions += 1
     
     if successful_transcriptions == len(audio_files):
         print(f"\n🎉 Successfully transcribed all {successful_transcriptions} files!")
@@ -128,43 +148,408 @@ def transcribe_audio_files(input_path, language="auto", model="base", output_dir
         print(f"\n⚠️  Transcribed {successful_transcriptions} out of {len(audio_files)} files")
         return False
 
+def transcribe_audio_arrays(chunks, language="auto", model="base", output_dir="transcripts",
+                            output_format="txt", workers=None, adaptive=False):
+    """
+    Transcribe in-memory audio chunks using Whisper.
+    
+    Args:
+        chunks: List of (name, audio) pairs; audio is a mono float32 NumPy array at 16 kHz
+        language: Language code (e.g., 'en', 'ru', 'es') or 'auto' for auto-detection
+        model: Whisper model size (tiny, base, small, medium, large)
+        output_dir: Output directory for transcripts
+        output_format: Output format (txt, json, srt, vtt)
+        workers: Number of parallel worker processes (default: based on CPU count and model)
+        adaptive: Use the tiny model for chunks where its probe transcription is confident
+    """
+    output_path = Path(output_dir)
+    try:
+        output_path.mkdir(parents=True, exist_ok=True)
+        print(f"📁 Created output directory: {output_dir}")
+    except Exception as e:
+        print(f"❌ Error creating output directory: {e}")
+        return False
+    
+    if workers is None:
+        workers = default_workers(model)
+    workers = max(1, min(workers, len(chunks)))
+    
+    successful_transcriptions = 0
+    if workers == 1:
+        print(f"\n🤖 Loading Whisper model '{model}'...")
+        try:
+            _init_worker(model, adaptive=adaptive)
+        except Exception as e:
+            print(f"❌ Error loading Whisper model: {e}")
+            return False
+        
+        for name, audio in chunks:
+            print(f"\n📝 Transcribing: {name}")
+            try:
+                result = _run_model(audio, language)
+                output_file = save_transcription(result, output_path, name, output_format)
+            except Exception as e:
+                print(f"❌ Error transcribing {name}: {e}")
+                continue
+            
+            if _report_transcription(output_file, result):
+                successful_transcriptions += 1
+    else:
+        # Chunks reach workers through shared memory instead of being pickled through a pipe;
+        # spawned rather than forked, as above
+        print(f"\n🤖 Loading Whisper model '{model}' in {workers} worker processes...")
+        num_threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(model, num_threads, adaptive)) as executor:
+            pending = {}
+            chunk_iter = iter(chunks)
+            try:
+                while True:
+                    # Keep at most two chunks per worker in flight to bound shared memory use
+                    for name, audio in chunk_iter:
+                        shm = SharedMemory(create=True, size=max(1, audio.nbytes))
+                        try:
+                            np.ndarray(audio.shape, dtype=audio.dtype, buffer=shm.buf)[:] = audio
+                            future = executor.submit(_transcribe_shared, shm.name, audio.shape, audio.dtype.str,
+                                                     name, language, output_path, output_format)
+                        except BaseException:
+                            shm.close()
+                            shm.unlink()
+                            raise
+                        pending[future] = (name, shm)
+                        if len(pending) >= 2 * workers:
+                            break
+                    
+                    if not pending:
+                        break
+                    
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, shm = pending.pop(future)
+                        shm.close()
+                        shm.unlink()
+                        
+                        print(f"\n📝 Transcribed: {name}")
+                        try:
+                            output_file, result = future.result()
+                        except Exception as e:
+                            print(f"❌ Error transcribing {name}: {e}")
+                            continue
+                        
+                        if _report_transcription(output_file, result):
+                            successful_transcriptions += 1
+            finally:
+                # A broken pool or an interrupt leaves segments behind that no worker will release
+                for name, shm in pending.values():
+                    shm.close()
+                    shm.unlink()
+    
+    if successful_transcriptions == len(chunks):
+        print(f"\n🎉 Successfully transcribed all {successful_transcriptions} chunks!")
+        return True
+    else:
+        print(f"\n⚠️  Transcribed {successful_transcriptions} out of {len(chunks)} chunks")
+        return False
+
+def transcribe_file(audio_file, language="auto", model="base", output_dir="transcripts", output_format="txt",
+                    adaptive=False):
+    """
+    Transcribe a single audio file in this process, reusing the cached model.
+    
+    Args:
+        audio_file: Path to audio file
+        language: Language code (e.g., 'en', 'ru', 'es') or 'auto' for auto-detection
+        model: Whisper model size (tiny, base, small, medium, large)
+        output_dir: Output directory for transcripts (must exist)
+        output_format: Output format (txt, json, srt, vtt)
+        adaptive: Use the tiny model if its probe transcription is confident
+    """
+    audio_file = Path(audio_file)
+    print(f"\n📝 Transcribing: {audio_file.name}")
+    
+    try:
+        _init_worker(model, adaptive=adaptive)
+        output_file, result = _transcribe_one(audio_file, language, Path(output_dir), output_format)
+    except Exception as e:
+        print(f"❌ Error transcribing {audio_file.name}: {e}")
+        return False
+    
+    return _report_transcription(output_file, result)
+
+def default_workers(model):
+    """Pick a worker count: half the cores, but a single worker on GPU or for big models on CPU."""
+    # Every worker would load its own copy of the model onto the same GPU
+    if _cuda_available() or model in ("medium", "large"):
+        return 1
+    return max(1, (os.cpu_count() or 1) // 2)
+
+def _cuda_available():
+    """Check for a CUDA device through CTranslate2, the runtime faster-whisper uses."""
+    return ctranslate2.get_cuda_device_count() > 0
+
+def get_model(model, cpu_threads=0):
+    """
+    Load a faster-whisper model with quantized weights, cached per process.
+    
+    Args:
+        model: Whisper model size (tiny, base, small, medium, large)
+        cpu_threads: Number of CPU threads (0 lets CTranslate2 decide)
+    """
+    # Positional call so get_model(m) and get_model(m, cpu_threads=0) share a cache entry
+    return _load_model(model, cpu_threads)
+
+@lru_cache(maxsize=2)
+def _load_model(model, cpu_threads):
+    """Construct a faster-whisper model for the available device."""
+    if _cuda_available():
+        return WhisperModel(model, device="cuda", compute_type="int8_float16")
+    return WhisperModel(model, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+
+def transcribe(whisper_model, audio, language="auto", **options):
+    """
+    Transcribe audio and return an openai-whisper style result dict.
+    
+    Args:
+        whisper_model: Loaded faster-whisper model
+        audio: Path to audio file or float32 NumPy array sampled at 16 kHz
+        language: Language code or 'auto' for auto-detection
+        **options: Extra faster-whisper transcribe() options
+    """
+    segments, info = whisper_model.transcribe(
+        audio,
+        language=None if language == "auto" else language,
+        beam_size=5,
+        vad_filter=True,
+        **options
+    )
+    
+    # Segments are generated lazily; consuming them runs the decoding
+    result_segments = [
+        {
+            "id": segment.id,
+            "start": segment.start,
+            "end": segment.end,
+            "text": segment.text,
+            "avg_logprob": segment.avg_logprob,
+            "no_speech_prob": segment.no_speech_prob,
+        }
+        for segment in segments
+    ]
+    
+    return {
+        "text": "".join(segment["text"] for segment in result_segments),
+        "segments": result_segments,
+        "language": info.language,
+    }
+
+def transcribe_adaptive(whisper_model, probe_model, audio, language="auto"):
+    """
+    Probe the start of the audio with a cheap model and only fall back to the full model when needed.
+    
+    Args:
+        whisper_model: Loaded faster-whisper model chosen by the user
+        probe_model: Loaded small faster-whisper model used for the probe
+        audio: Path to audio file or float32 NumPy array sampled at 16 kHz
+        language: Language code or 'auto' for auto-detection
+    
+    Returns:
+        (result, used_probe_model) tuple
+    """
+    if not isinstance(audio, np.ndarray):
+        audio = decode_audio(str(audio), sampling_rate=SAMPLE_RATE)
+    
+    probe_audio = audio[:PROBE_SECONDS * SAMPLE_RATE]
+    probe = transcribe(probe_model, probe_audio, language, condition_on_previous_text=False)
+    probe_segments = probe["segments"]
+    confident = (
+        bool(probe_segments)
+        and np.mean([segment["avg_logprob"] for segment in probe_segments]) > MIN_AVG_LOGPROB
+        and max(segment["no_speech_prob"] for segment in probe_segments) < MAX_NO_SPEECH_PROB
+    )
+    
+    # An unconfident probe (e.g. a silent or music intro) may have guessed the language wrong too
+    if not confident:
+        return transcribe(whisper_model, audio, language), False
+    
+    # The probe already detected the language; don't make the next pass detect it again
+    language = probe["language"]
+    if len(audio) <= len(probe_audio):
+        return probe, True
+    return transcribe(probe_model, audio, language, condition_on_previous_text=False), True
+
+# Whisper model(s) of the current (worker) process
+whisper_model = None
+whisper_model_name = None
+probe_model = None
+# Language found by the first confident adaptive probe, reused for later chunks of this run
+probe_language = None
+
+def _init_worker(model, num_threads=0, adaptive=False):
+    """Load the Whisper model (and the probe model in adaptive mode) once per process."""
+    global whisper_model, whisper_model_name, probe_model, probe_language
+    whisper_model = get_model(model, cpu_threads=num_threads)
+    whisper_model_name = model
+    probe_model = None
+    probe_language = None
+    if adaptive and model != PROBE_MODEL:
+        probe_model = get_model(PROBE_MODEL, cpu_threads=num_threads)
+
+def _run_model(audio, language):
+    """Transcribe with the process-wide model, going through the probe first in adaptive mode."""
+    global probe_language
+    if probe_model is None:
+        return transcribe(whisper_model, audio, language)
+    
+    if language == "auto" and probe_language:
+        language = probe_language
+    result, used_probe_model = transcribe_adaptive(whisper_model, probe_model, audio, language)
+    if language == "auto" and used_probe_model:
+        probe_language = result["language"]
+    
+    result["model"] = PROBE_MODEL if used_probe_model else whisper_model_name
+    return result
+
+def _transcribe_one(audio_file, language, output_path, output_format, offset=0.0):
+    """Transcribe a single file with the process-wide model and save the result."""
+    result = _run_model(_load_audio(audio_file), language)
+    
+    # Shift segment times from chunk-relative to source-relative
+    if offset:
+        for segment in result["segments"]:
+            segment["start"] += offset
+            segment["end"] += offset
+    
+    output_file = save_transcription(result, output_path, audio_file.stem, output_format)
+    return output_file, result
+
+def _load_audio(audio_file):
+    """Read 16 kHz mono WAV straight into an array; other files are left for Whisper to decode."""
+    audio_file_str = str(audio_file)
+    if audio_file.suffix.lower() == '.wav':
+        # Check the header first, so other WAVs aren't read in full only to be decoded again
+        info = sf.info(audio_file_str)
+        if info.samplerate == SAMPLE_RATE and info.channels == 1:
+            audio, _ = sf.read(audio_file_str, dtype='float32')
+            return audio
+    return audio_file_str
+
+def _transcribe_shared(shm_name, shape, dtype, name, language, output_path, output_format):
+    """Transcribe a chunk that the parent placed in shared memory, without copying it."""
+    shm = SharedMemory(name=shm_name)
+    audio = None
+    try:
+        audio = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        result = _run_model(audio, language)
+    finally:
+        # The view must be gone before the segment can be closed, even if transcription failed
+        audio = None
+        shm.close()
+    
+    output_file = save_transcription(result, output_path, name, output_format)
+    return output_file, result
+
+def _load_chunk_offsets(chunks_dir):
+    """Read chunk start offsets (seconds) from a VAD chunk manifest, if there is one."""
+    manifest_file = Path(chunks_dir) / CHUNK_MANIFEST
+    if not manifest_file.is_file():
+        return {}
+    
+    with open(manifest_file, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return {name: chunk["start"] for name, chunk in manifest.items()}
+
+def _report_transcription(output_file, result):
+    """Print saved file, detected language and preview. Returns True if the file was saved."""
+    if output_file is None:
+        return False
+    
+    # Show preview and detected language
+    detected_language = result.get("language", "unknown")
+    preview = result["text"][:100] + "..." if len(result["text"]) > 100 else result["text"]
+    
+    print(f"✅ Saved: {output_file.name}")
+    print(f"🌐 Detected language: {detected_language}")
+    if "model" in result:
+        print(f"🤖 Model used: {result['model']}")
+    print(f"📄 Preview: {preview}")
+    return True
+
+def save_transcription(result, output_path, base_name, output_format):
+    """
+    Save a Whisper result to disk in the requested format.
+    
+    Args:
+        result: Whisper transcription result
+        output_path: Output directory for transcripts
+        base_name: Output filename without extension
+        output_format: Output format (txt, json, srt, vtt)
+    
+    Returns:
+        Path of the written file, or None if the format is unsupported
+    """
+    if output_format == "txt":
+        output_file = output_path / f"{base_name}.txt"
+        content = result["text"]
+    elif output_format == "json":
+        output_file = output_path / f"{base_name}.json"
+        content = None
+    elif output_format == "srt":
+        output_file = output_path / f"{base_name}.srt"
+        content = generate_srt(result["segments"])
+    elif output_format == "vtt":
+        output_file = output_path / f"{base_name}.vtt"
+        content = generate_vtt(result["segments"])
+    else:
+        print(f"❌ Unsupported output format: {output_format}")
+        return None
+    
+    # Save transcription through a 1 MiB buffer; JSON is streamed instead of built in memory
+    with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        if content is None:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        else:
+            f.write(content)
+    
+    return output_file
+
 def generate_srt(segments):
     """Generate SRT format subtitles from Whisper segments."""
-    srt_content = ""
+    parts = []
     for i, segment in enumerate(segments, 1):
         start_time = format_time_srt(segment["start"])
         end_time = format_time_srt(segment["end"])
         text = segment["text"].strip()
         
-        srt_content += f"{i}\n{start_time} --> {end_time}\n{text}\n\n"
+        parts.append(f"{i}\n{start_time} --> {end_time}\n{text}\n\n")
     
-    return srt_content
+    return "".join(parts)
 
 def generate_vtt(segments):
     """Generate VTT format subtitles from Whisper segments."""
-    vtt_content = "WEBVTT\n\n"
+    parts = ["WEBVTT\n\n"]
     for segment in segments:
         start_time = format_time_vtt(segment["start"])
         end_time = format_time_vtt(segment["end"])
         text = segment["text"].strip()
         
-        vtt_content += f"{start_time} --> {end_time}\n{text}\n\n"
+        parts.append(f"{start_time} --> {end_time}\n{text}\n\n")
     
-    return vtt_content
+    return "".join(parts)
+
+def _format_time(seconds, separator):
+    """Format time as HH:MM:SS<separator>mmm using integer milliseconds."""
+    hours, milliseconds = divmod(int(round(seconds * 1000)), 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return "%02d:%02d:%02d%s%03d" % (hours, minutes, secs, separator, milliseconds)
 
 def format_time_srt(seconds):
     """Format time for SRT format (HH:MM:SS,mmm)."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace('.', ',')
+    return _format_time(seconds, ",")
 
 def format_time_vtt(seconds):
     """Format time for VTT format (HH:MM:SS.mmm)."""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+    return _format_time(seconds, ".")
 
 def main():
     parser = argparse.ArgumentParser(description="Transcribe audio files using Whisper")
@@ -178,6 +563,10 @@ def main():
     parser.add_argument("-f", "--format", default="txt", 
                        choices=["txt", "json", "srt", "vtt"],
                        help="Output format (default: txt)")
+    parser.add_argument("-j", "--workers", type=int,
+                       help="Number of parallel transcription processes (default: half the CPU cores, 1 for medium/large on CPU)")
+    parser.add_argument("--adaptive-model", action="store_true",
+                       help="Probe each file with the tiny model and keep its output when it is confident")
     
     args = parser.parse_args()
     
@@ -186,7 +575,9 @@ def main():
         args.language,
         args.model,
         args.output_dir,
-        args.format
+        args.format,
+        args.workers,
+        args.adaptive_model
     )
     
     sys.exit(0 if success else 1)
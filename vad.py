@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Voice Activity Detection
+Energy-based speech detection used to skip silence before transcription.
+"""
+
+import math
+import numpy as np
+
+# Sample rate audio is analysed at; also what Whisper expects
+SAMPLE_RATE = 16000
+
+# Frames quieter than this (RMS, dBFS) are treated as silence
+DEFAULT_THRESHOLD_DB = -40.0
+
+# Written next to VAD chunks: maps chunk filename to its start/end in the source (seconds)
+CHUNK_MANIFEST = "chunks.json"
+
+def detect_speech(audio, sample_rate=SAMPLE_RATE, frame_ms=30, threshold_db=DEFAULT_THRESHOLD_DB):
+    """
+    Find speech regions in mono PCM audio.
+    
+    Args:
+        audio: Mono float32 NumPy array in [-1, 1]
+        sample_rate: Sample rate of audio in Hz
+        frame_ms: Analysis frame length in milliseconds (default: 30)
+        threshold_db: Frame RMS level in dBFS above which a frame counts as speech
+    
+    Returns:
+        List of (start_sec, end_sec) tuples of consecutive speech frames
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    num_frames = len(audio) // frame_len
+    if num_frames == 0:
+        return []
+    
+    # RMS level per frame, in dBFS; einsum sums the squares without a squared copy of the whole audio
+    frames = audio[:num_frames * frame_len].reshape(num_frames, frame_len)
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / frame_len)
+    level_db = 20 * np.log10(rms + 1e-10)
+    is_speech = level_db > threshold_db
+    
+    # Rising/falling edges of the speech mask give run boundaries
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0]))))
+    frame_sec = frame_len / sample_rate
+    return [(start * frame_sec, end * frame_sec) for start, end in zip(edges[0::2], edges[1::2])]
+
+def plan_chunks(speech_spans, max_chunk_sec, total_sec, padding_sec=0.5,
+                min_silence_sec=2.0, min_speech_sec=1.0):
+    """
+    Turn speech spans into chunk boundaries that leave out long silences.
+    
+    Args:
+        speech_spans: (start_sec, end_sec) tuples from detect_speech
+        max_chunk_sec: Maximum chunk length in seconds
+        total_sec: Total audio duration in seconds
+        padding_sec: Padding kept around speech (default: 0.5)
+        min_silence_sec: Shorter pauses are kept inside a chunk (default: 2.0)
+        min_speech_sec: Regions with less speech than this are dropped (default: 1.0)
+    
+    Returns:
+        List of (start_sec, end_sec) tuples
+    """
+    # Merge spans separated by short pauses, tracking how much actual speech each holds
+    regions = []
+    for start, end in speech_spans:
+        if regions and start - regions[-1][1] < min_silence_sec:
+            regions[-1][1] = end
+            regions[-1][2] += end - start
+        else:
+            regions.append([start, end, end - start])
+    
+    chunks = []
+    for start, end, speech_sec in regions:
+        if speech_sec < min_speech_sec:
+            continue
+        
+        start = max(0.0, start - padding_sec)
+        end = min(total_sec, end + padding_sec)
+        
+        # Long regions are split evenly, so no chunk ends up as a tiny leftover tail
+        num_pieces = math.ceil((end - start) / max_chunk_sec)
+        piece_sec = (end - start) / num_pieces
+        for i in range(num_pieces):
+            chunks.append((start + i * piece_sec, end if i == num_pieces - 1 else start + (i + 1) * piece_sec))
+    
+    return chunks
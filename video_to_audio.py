@@ -9,6 +9,15 @@ import os
 import sys
 import subprocess
 from pathlib import Path
+import numpy as np
+
+# Requested format -> (ffprobe codec name that can be stream-copied, encoder to use otherwise)
+AUDIO_CODECS = {
+    "mp3": ("mp3", "libmp3lame"),
+    "aac": ("aac", "aac"),
+    "flac": ("flac", "flac"),
+    "wav": ("pcm_s16le", "pcm_s16le"),
+}
 
 def convert_video_to_audio(input_file, output_file=None, audio_format="mp3", quality="192k", force_overwrite=False):
     """
@@ -19,7 +28,7 @@ def convert_video_to_audio(input_file, output_file=None, audio_format="mp3", qua
         output_file: Path to output audio file (optional)
         audio_format: Audio format (mp3, wav, etc.)
         quality: Audio quality/bitrate
-        force_overwrite: If True, overwrite existing files without asking
+        force_overwrite: Kept for compatibility; existing files are always overwritten
     """
     input_path = Path(input_file)
     
@@ -34,31 +43,39 @@ def convert_video_to_audio(input_file, output_file=None, audio_format="mp3", qua
     
     output_path = Path(output_file)
     
-    # Check if output file already exists
-    if output_path.exists() and not force_overwrite:
-        response = input(f"⚠️  Output file '{output_file}' already exists. Overwrite? (y/N): ")
-        if response.lower() != 'y':
-            print("❌ Operation cancelled.")
-            return False
-    elif output_path.exists() and force_overwrite:
+    # Never prompt: this runs unattended from the pipeline
+    if output_path.exists():
         print(f"⚠️  Output file '{output_file}' already exists. Overwriting...")
     
-    print(f"🎬 Converting '{input_file}' to '{output_file}'...")
+    # Stream-copy when the source audio is already in the requested codec
+    source_codec = probe_audio_codec(input_path)
+    copy_codec, encoder = AUDIO_CODECS.get(audio_format, ("mp3", "libmp3lame"))
+    if source_codec == copy_codec:
+        codec_args = ["-acodec", "copy"]
+        print(f"🎬 Copying {source_codec} audio from '{input_file}' to '{output_file}'...")
+    else:
+        codec_args = ["-acodec", encoder]
+        if audio_format in ("mp3", "aac"):
+            codec_args += ["-ab", quality]
+        print(f"🎬 Converting '{input_file}' to '{output_file}'...")
     
     # FFmpeg command
     cmd = [
         "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
         "-i", str(input_path),
         "-vn",  # No video
-        "-acodec", "libmp3lame" if audio_format == "mp3" else "copy",
-        "-ab", quality,
+        *codec_args,
         "-y",  # Overwrite output file
         str(output_path)
     ]
     
     try:
-        # Run FFmpeg
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # Run FFmpeg; only errors are collected, progress output is discarded
+        result = subprocess.run(cmd, check=False, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True)
         
         if result.returncode == 0:
             print(f"✅ Successfully converted to: {output_file}")
@@ -76,6 +93,74 @@ def convert_video_to_audio(input_file, output_file=None, audio_format="mp3", qua
         print(f"❌ Error during conversion: {e}")
         return False
 
+def probe_audio_codec(input_file):
+    """Return the codec name of the first audio stream (e.g. 'aac'), or None if unknown."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name",
+        "-of", "csv=p=0",
+        str(input_file)
+    ]
+    
+    try:
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    
+    codec = result.stdout.strip()
+    return codec if result.returncode == 0 and codec else None
+
+def convert_to_memory(input_file, sample_rate=16000):
+    """
+    Decode the audio track of a media file into memory.
+    
+    Args:
+        input_file: Path to input video or audio file
+        sample_rate: Output sample rate in Hz (default: 16000, what Whisper expects)
+    
+    Returns:
+        Mono float32 NumPy array, or None on failure
+    """
+    input_path = Path(input_file)
+    
+    # Check if input file exists
+    if not input_path.exists():
+        print(f"❌ Error: Input file '{input_file}' not found.")
+        return None
+    
+    print(f"🎬 Decoding '{input_file}' into memory ({sample_rate} Hz mono)...")
+    
+    # FFmpeg command: raw float32 PCM on stdout
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", str(input_path),
+        "-vn",  # No video
+        "-f", "f32le",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+    
+    try:
+        pcm = subprocess.check_output(cmd, stdin=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        print("❌ Error: FFmpeg not found. Please install FFmpeg first.")
+        print("   macOS: brew install ffmpeg")
+        print("   Linux: sudo apt-get install ffmpeg")
+        return None
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg error: {e.stderr.decode(errors='replace')}")
+        return None
+    
+    audio = np.frombuffer(pcm, dtype=np.float32)
+    print(f"✅ Decoded {len(audio) / sample_rate / 60:.2f} minutes of audio")
+    return audio
+
 def main():
     parser = argparse.ArgumentParser(description="Convert video files to audio format")
     parser.add_argument("input_file", help="Input video file path")
@@ -85,7 +170,7 @@ def main():
     parser.add_argument("-q", "--quality", default="192k", 
                        help="Audio quality/bitrate (default: 192k)")
     parser.add_argument("--force", action="store_true", 
-                       help="Overwrite existing files without asking")
+                       help="Kept for compatibility; existing files are always overwritten")
     
     args = parser.parse_args()
     